@@ -1,15 +1,42 @@
 """
-database.py — SQLite async database layer using aiosqlite
+database.py — SQLite async database layer
+
+Reads go through aiosqlite; writes use a stdlib sqlite3 connection driven from
+asyncio.to_thread, which skips aiosqlite's per-call queue round trips.
 """
 
+import asyncio
 import aiosqlite
 import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Sequence
+from itertools import chain
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).parent / "news.db"
 
+# Process-wide connections, opened in init_db() and closed in close_db():
+# an aiosqlite one for reads and a plain sqlite3 one (autocommit mode, explicit
+# BEGIN/COMMIT) for writes. The asyncio lock keeps write transactions from
+# interleaving on the shared write connection. The thread lock is held by the
+# worker-thread side of every write, so the connection is never closed under a
+# write that outlived its (e.g. cancelled) awaiting task.
+_db: aiosqlite.Connection | None = None
+_write_db: sqlite3.Connection | None = None
+_write_lock = asyncio.Lock()
+_write_thread_lock = threading.Lock()
+
+# SQLite keeps no row count, so COUNT(*) walks the whole table. Keep a running
+# total (bumped by upserts) and only recount when it's older than the TTL, to
+# pick up rows changed outside this process.
+TOTAL_COUNT_TTL = 600  # seconds
+_cached_total: int | None = None
+_cached_total_at = 0.0
+
 CREATE_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS news_items (
     id           INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -22,80 +49,297 @@ CREATE TABLE IF NOT EXISTS news_items (
     fetched_at   TEXT    NOT NULL
 );
 
-CREATE INDEX IF NOT EXISTS idx_published_at ON news_items (published_at DESC);
+-- Matches get_news' ORDER BY so LIMIT streams from the index without a sort
+-- step (id is the tiebreak for stable paging); it also covers the old
+-- published_at-only index, which is dropped.
+DROP INDEX IF EXISTS idx_published_at;
+CREATE INDEX IF NOT EXISTS idx_pub_fetched ON news_items (published_at DESC, fetched_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_source_name  ON news_items (source_name);
+
+-- HTTP cache validators per feed, for conditional GETs. Keyed on the
+-- filter_keyword too: a 304 only means "same body", so after the keyword
+-- changes the feed must be parsed again.
+CREATE TABLE IF NOT EXISTS feed_validators (
+    url            TEXT NOT NULL,
+    filter_keyword TEXT NOT NULL DEFAULT '',
+    etag           TEXT,
+    last_modified  TEXT,
+    PRIMARY KEY (url, filter_keyword)
+);
+"""
+
+# Per-connection tuning, applied once when the shared connection is opened.
+# WAL lets API reads proceed while the hourly refresh is writing; NORMAL sync
+# is durable across app crashes and only fsyncs at checkpoints.
+PRAGMA_SQL = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+PRAGMA temp_store = MEMORY;
+PRAGMA cache_size = -32000;
+PRAGMA mmap_size = 268435456;
+PRAGMA journal_size_limit = 67108864;
+PRAGMA busy_timeout = 5000;
+"""
+
+# Column order of the item tuples produced by feed_parser and bound by the upsert.
+NEWS_COLUMNS = (
+    "title", "url", "summary", "published_at", "source_name", "category", "fetched_at",
+)
+
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER is 999 → 999 // 7 columns = 142;
+# 90 rows per statement keeps well under that on older builds too.
+INSERT_CHUNK = 90
+
+_INSERT_ROW = "(" + ", ".join("?" * len(NEWS_COLUMNS)) + ")"
+
+
+def _insert_sql(rows: int) -> str:
+    """Build an INSERT OR IGNORE statement with `rows` VALUES tuples."""
+    return (
+        f"INSERT OR IGNORE INTO news_items ({', '.join(NEWS_COLUMNS)})\n"
+        f"VALUES {', '.join([_INSERT_ROW] * rows)}"
+    )
+
+
+# Prepared once; leftovers that don't fill a chunk go through the single-row form.
+INSERT_SQL = _insert_sql(1)
+INSERT_CHUNK_SQL = _insert_sql(INSERT_CHUNK)
+
+# Refresh rows whose summary changed. Numbered parameters index straight into
+# the NEWS_COLUMNS tuple (?2 = url, ?3 = summary, ?7 = fetched_at).
+UPDATE_SQL = """
+UPDATE news_items SET
+    summary = ?3,
+    fetched_at = ?7
+WHERE url = ?2
 """
 
+# Store a feed's latest cache validators (url, filter_keyword, etag, last_modified).
+ValidatorRow = tuple[str, str, str | None, str | None]
+FEED_VALIDATORS_SQL = """
+INSERT INTO feed_validators (url, filter_keyword, etag, last_modified)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(url, filter_keyword) DO UPDATE SET
+    etag = excluded.etag,
+    last_modified = excluded.last_modified
+"""
+
+# SQLite documents aggregate input order as arbitrary. 3.44+ accepts ORDER BY
+# inside the aggregate, which pins the page order explicitly. Before that, the
+# order relies on the planner running the LIMITed, ORDER BY'd subquery as a
+# co-routine that feeds rows to json_group_array in sequence (it does today).
+_AGG_ORDER_BY = " ORDER BY rn" if sqlite3.sqlite_version_info >= (3, 44, 0) else ""
+
+# URLs per existence lookup; one bound variable each, under the 999 default.
+URL_LOOKUP_CHUNK = 500
+
+
+def _conn() -> aiosqlite.Connection:
+    """Return the shared read connection opened by init_db()."""
+    if _db is None:
+        raise RuntimeError("Database not initialised; call init_db() first")
+    return _db
+
+
+def _write_conn() -> sqlite3.Connection:
+    """Return the shared write connection opened by init_db()."""
+    if _write_db is None:
+        raise RuntimeError("Database not initialised; call init_db() first")
+    return _write_db
+
+
+def _open_write_conn() -> sqlite3.Connection:
+    """Open the sqlite3 write connection in autocommit mode with the shared pragmas."""
+    db = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False)
+    db.executescript(PRAGMA_SQL)
+    return db
+
 
 async def init_db() -> None:
-    """Create the database and tables if they don't exist."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.executescript(CREATE_TABLE_SQL)
-        await db.commit()
-    logger.info(f"Database initialised at {DB_PATH}")
+    """Open the shared connections and create tables if they don't exist."""
+    global _db, _write_db
+    if _db is None:
+        _db = await aiosqlite.connect(DB_PATH)
+        _db.row_factory = aiosqlite.Row
+        await _db.executescript(PRAGMA_SQL)
+    await _db.executescript(CREATE_TABLE_SQL)
+    await _db.commit()
+    if _write_db is None:
+        _write_db = await asyncio.to_thread(_open_write_conn)
+    await _refresh_total_count()
+    logger.info("Database initialised at %s", DB_PATH)
 
 
-async def upsert_news_items(items: list[dict]) -> int:
+def _sync_close_write_conn() -> None:
+    """Close the write connection once any in-flight write has returned."""
+    global _write_db
+    with _write_thread_lock:
+        if _write_db is not None:
+            _write_db.close()
+            _write_db = None
+
+
+async def close_db() -> None:
+    """Close the shared connections (app shutdown)."""
+    global _db
+    async with _write_lock:
+        await asyncio.to_thread(_sync_close_write_conn)
+    if _db is not None:
+        await _db.close()
+        _db = None
+        logger.info("Database connection closed.")
+
+
+def _existing_summaries(db: sqlite3.Connection, urls: list[str]) -> dict[str, str]:
+    """Return {url: summary} for the given URLs that are already stored."""
+    existing: dict[str, str] = {}
+    for start in range(0, len(urls), URL_LOOKUP_CHUNK):
+        chunk = urls[start:start + URL_LOOKUP_CHUNK]
+        cur = db.execute(
+            f"SELECT url, summary FROM news_items WHERE url IN ({', '.join('?' * len(chunk))})",
+            chunk,
+        )
+        existing.update(cur.fetchall())
+    return existing
+
+
+def _sync_upsert(rows: list[tuple], validators: list[ValidatorRow]) -> int:
+    """Blocking body of upsert_news_items; runs in a worker thread."""
+    with _write_thread_lock:
+        return _sync_upsert_locked(rows, validators)
+
+
+def _sync_upsert_locked(rows: list[tuple], validators: list[ValidatorRow]) -> int:
+    db = _write_conn()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        # One indexed lookup per chunk of URLs replaces a write probe per row;
+        # unchanged rows (the common case on refresh) are not written at all.
+        existing = _existing_summaries(db, [row[1] for row in rows])
+        new_rows = [row for row in rows if row[1] not in existing]
+        changed_rows = [
+            row for row in rows
+            if row[1] in existing and row[2] and row[2] != existing[row[1]]
+        ]
+
+        if changed_rows:
+            db.executemany(UPDATE_SQL, changed_rows)
+
+        # OR IGNORE still guards against rows another process added meanwhile;
+        # rowcount then counts only what was actually inserted.
+        inserted = 0
+        full = len(new_rows) - len(new_rows) % INSERT_CHUNK
+        for start in range(0, full, INSERT_CHUNK):
+            chunk = new_rows[start:start + INSERT_CHUNK]
+            inserted += db.execute(INSERT_CHUNK_SQL, list(chain.from_iterable(chunk))).rowcount
+        if full < len(new_rows):
+            inserted += db.executemany(INSERT_SQL, new_rows[full:]).rowcount
+
+        # Same transaction as the items: validators only stick if the items did.
+        if validators:
+            db.executemany(FEED_VALIDATORS_SQL, validators)
+
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+    return inserted
+
+
+async def upsert_news_items(
+    items: list[tuple], validators: Sequence[ValidatorRow] = ()
+) -> int:
     """
-    Insert new news items, silently ignoring duplicates (same URL).
-    Returns the number of newly inserted rows.
+    Insert new news items (tuples in NEWS_COLUMNS order); existing URLs get their
+    summary/fetched_at refreshed only when a new non-empty summary differs from
+    the stored one. `validators` rows (url, filter_keyword, etag, last_modified)
+    are saved in the same transaction. Returns the number of newly inserted rows.
     """
-    if not items:
+    if not items and not validators:
         return 0
 
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Get count before insertion
-        async with db.execute("SELECT COUNT(*) FROM news_items") as cur:
-            row = await cur.fetchone()
-            count_before = row[0] if row else 0
-
-        for item in items:
-            try:
-                await db.execute(
-                    """
-                    INSERT INTO news_items
-                        (title, url, summary, published_at, source_name, category, fetched_at)
-                    VALUES
-                        (:title, :url, :summary, :published_at, :source_name, :category, :fetched_at)
-                    ON CONFLICT(url) DO UPDATE SET
-                        summary = CASE WHEN excluded.summary != '' THEN excluded.summary ELSE news_items.summary END,
-                        fetched_at = excluded.fetched_at
-                    """,
-                    item,
-                )
-            except Exception as exc:
-                logger.error(f"DB insert error for {item.get('url')}: {exc}")
-        
-        await db.commit()
-
-        # Get count after insertion
-        async with db.execute("SELECT COUNT(*) FROM news_items") as cur:
-            row = await cur.fetchone()
-            count_after = row[0] if row else 0
-
-    return count_after - count_before
-
-
-async def get_news(limit: int = 200, offset: int = 0) -> list[dict]:
-    """Return news items ordered by published_at DESC."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute(
-            """
-            SELECT id, title, url, summary, published_at, source_name, category, fetched_at
-            FROM   news_items
-            ORDER  BY published_at DESC, fetched_at DESC
-            LIMIT  ? OFFSET ?
-            """,
-            (limit, offset),
-        ) as cursor:
-            rows = await cursor.fetchall()
-    return [dict(r) for r in rows]
+    # Feeds overlap and repeat entries across refreshes; keep the last item per URL.
+    rows = list({item[1]: item for item in items}.values())
+
+    # Transactions are per connection, so concurrent refreshes must take turns.
+    async with _write_lock:
+        try:
+            inserted = await asyncio.to_thread(_sync_upsert, rows, list(validators))
+        except Exception as exc:
+            logger.error("DB upsert error (%d items): %s", len(rows), exc)
+            return 0
+
+    global _cached_total
+    if _cached_total is not None:
+        _cached_total += inserted
+    return inserted
+
+
+async def get_news_json(
+    limit: int = 200,
+    offset: int = 0,
+    after: tuple[str, str, int] | None = None,
+) -> tuple[str, tuple[str, str, int] | None]:
+    """
+    Return a page of news items ordered by published_at DESC as a JSON array string,
+    plus the (published_at, fetched_at, id) cursor of its last row, or None if the
+    page is not full. SQLite builds the JSON itself, so no per-row Python objects
+    are created.
+
+    Pass a previous page's cursor as `after` for keyset pagination: the index seeks
+    straight to it instead of walking and discarding OFFSET rows.
+    """
+    where = "WHERE (published_at, fetched_at, id) < (?, ?, ?)" if after else ""
+    # The bare published_at/fetched_at/id columns come from the max(rn) row,
+    # i.e. the last row of the page.
+    async with _conn().execute(
+        f"""
+        SELECT json_group_array(json_object(
+                   'id', id, 'title', title, 'url', url, 'summary', summary,
+                   'published_at', published_at, 'source_name', source_name,
+                   'category', category, 'fetched_at', fetched_at
+               ){_AGG_ORDER_BY}),
+               count(*), published_at, fetched_at, id, max(rn)
+        FROM  (SELECT id, title, url, summary, published_at, source_name, category, fetched_at,
+                      row_number() OVER (ORDER BY published_at DESC, fetched_at DESC, id DESC) AS rn
+               FROM   news_items
+               {where}
+               ORDER  BY published_at DESC, fetched_at DESC, id DESC
+               LIMIT  ? OFFSET ?)
+        """,
+        (*(after or ()), limit, offset),
+    ) as cursor:
+        row = await cursor.fetchone()
+
+    if not row:
+        return "[]", None
+    items_json, count, last_published_at, last_fetched_at, last_id, _ = row
+    next_cursor = (last_published_at, last_fetched_at, last_id) if count == limit else None
+    return items_json, next_cursor
+
+
+async def _refresh_total_count() -> int:
+    """Recount news_items and reset the cached total."""
+    global _cached_total, _cached_total_at
+    async with _conn().execute("SELECT COUNT(*) FROM news_items") as cur:
+        row = await cur.fetchone()
+    _cached_total = row[0] if row else 0
+    _cached_total_at = time.monotonic()
+    return _cached_total
 
 
 async def get_total_count() -> int:
-    """Return the total number of stored news items."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute("SELECT COUNT(*) FROM news_items") as cur:
-            row = await cur.fetchone()
-    return row[0] if row else 0
+    """Return the total number of stored news items (cached, see TOTAL_COUNT_TTL)."""
+    if _cached_total is None or time.monotonic() - _cached_total_at > TOTAL_COUNT_TTL:
+        return await _refresh_total_count()
+    return _cached_total
+
+
+async def get_feed_validators(url: str, filter_keyword: str) -> dict | None:
+    """Return the saved ETag/Last-Modified for a feed URL and filter keyword, if any."""
+    async with _conn().execute(
+        "SELECT etag, last_modified FROM feed_validators WHERE url = ? AND filter_keyword = ?",
+        (url, filter_keyword),
+    ) as cur:
+        row = await cur.fetchone()
+    return dict(row) if row else None
@@ -7,38 +7,92 @@ Future: type: scraper sources will be handled by separate modules in scrapers/.
 
 import asyncio
 import hashlib
+import importlib.util
 import logging
+import re
+import sys
+import time
+from collections import defaultdict
 from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Mapping, Optional
+from urllib.parse import urlsplit
 
-import feedparser
+import feedparser  # type: ignore[import-untyped]  # no stubs published
 import httpx
 import yaml
 from dateutil import parser as dateutil_parser
 
+from database import ValidatorRow, get_feed_validators
+
 logger = logging.getLogger(__name__)
 
 SOURCES_PATH = Path(__file__).parent / "sources.yaml"
 REQUEST_TIMEOUT = 15  # seconds
+USER_AGENT = "newsecurity/1.0 (+https://github.com/newsecurity)"
+
+# HTTP/2 needs the optional `h2` package (httpx[http2]); fall back to HTTP/1.1.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# At most this many feeds are fetched/parsed at once; same-host feeds run one at a time.
+MAX_CONCURRENT_FEEDS = 8
+_FEED_SEM = asyncio.Semaphore(MAX_CONCURRENT_FEEDS)
+
+# Shared across all feeds so same-host sources reuse keep-alive / HTTP/2 connections.
+_CLIENT: httpx.AsyncClient | None = None
+
+# One item in database.NEWS_COLUMNS order:
+# (title, url, summary, published_at, source_name, category, fetched_at).
+NewsRow = tuple[str, str, str, str, str, str, str]
+
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
 
+# libyaml's C loader parses ~10x faster; fall back to the pure-Python one.
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
-def _load_sources() -> list[dict]:
-    """Load source definitions from sources.yaml."""
-    with open(SOURCES_PATH, encoding="utf-8") as f:
-        data = yaml.safe_load(f)
-    return data.get("sources", [])
+# (mtime, sources) of the last sources.yaml parse.
+_SOURCES_CACHE: tuple[float, list[dict]] | None = None
+
+
+def load_sources_cached() -> list[dict]:
+    """Return source definitions from sources.yaml, re-parsing only when the file changes."""
+    global _SOURCES_CACHE
+    mtime = SOURCES_PATH.stat().st_mtime
+    if _SOURCES_CACHE is None or _SOURCES_CACHE[0] != mtime:
+        with open(SOURCES_PATH, encoding="utf-8") as f:
+            data = yaml.load(f, Loader=_YAML_LOADER) or {}
+        _SOURCES_CACHE = (mtime, data.get("sources", []))
+    return _SOURCES_CACHE[1]
+
+
+def _parse_date_text(raw: str) -> datetime:
+    """Parse an RFC-2822 or ISO-8601 date string, using dateutil only as a last resort."""
+    try:
+        return parsedate_to_datetime(raw)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(raw)
+    except ValueError:
+        return dateutil_parser.parse(raw)
 
 
-def _normalize_date(raw: str | None) -> str:
-    """Parse any date string into ISO-8601 format. Falls back to current UTC time."""
+def _normalize_date(raw: str | None, parsed: time.struct_time | None = None) -> str:
+    """
+    Return a UTC ISO-8601 timestamp for an entry date. Falls back to current UTC time.
+    `parsed` is feedparser's pre-parsed (UTC) struct_time and is preferred over `raw`.
+    """
+    if parsed:
+        return datetime(*parsed[:6], tzinfo=timezone.utc).isoformat()
     if not raw:
         return datetime.now(timezone.utc).isoformat()
     try:
-        dt = dateutil_parser.parse(raw)
+        dt = _parse_date_text(raw)
         if dt.tzinfo is None:
             dt = dt.replace(tzinfo=timezone.utc)
-        return dt.isoformat()
+        return dt.astimezone(timezone.utc).isoformat()
     except Exception:
         return datetime.now(timezone.utc).isoformat()
 
@@ -47,114 +101,216 @@ def _clean_summary(text: str | None, max_len: int = 300) -> str:
     """Strip HTML tags and truncate summary text."""
     if not text:
         return ""
-    import re
-    text = re.sub(r"<[^>]+>", "", text)
+    text = _HTML_TAG_RE.sub("", text)
     text = text.strip()
     return text[:max_len] + ("…" if len(text) > max_len else "")
 
 
+def _may_contain_keyword(raw: bytes, keyword: str) -> bool:
+    """
+    Cheap pre-parse check on the raw feed body. Returns False only when no entry
+    can match `keyword`, so the whole parse can be skipped.
+    """
+    # Non-ASCII keywords depend on the feed's encoding and markup characters may
+    # be entity-escaped in the XML; leave those to the per-entry check.
+    if not keyword.isascii() or any(c in keyword for c in "&<>\"'"):
+        return True
+    # Check each word separately: summaries are matched after HTML stripping,
+    # so a multi-word keyword may be split by tags in the raw body.
+    raw_lower = raw.lower()
+    return all(word.encode() in raw_lower for word in keyword.split())
+
+
 def _url_hash(url: str) -> str:
     return hashlib.sha256(url.encode()).hexdigest()[:16]
 
 
-async def _fetch_rss(source: dict) -> list[dict]:
-    """Fetch and parse a single RSS/Atom feed."""
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use."""
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=REQUEST_TIMEOUT,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
+    return _CLIENT
+
+
+async def close_client() -> None:
+    """Close the shared HTTP client (app shutdown)."""
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+
+
+def _entry_to_item(
+    entry: Mapping[str, Any],
+    name: str,
+    category: str,
+    fetched_at: str,
+    filter_keyword: str,
+) -> NewsRow | None:
+    """
+    Convert one feedparser entry into a NEWS_COLUMNS-ordered tuple.
+    Returns None for entries without a URL or not matching `filter_keyword`.
+    """
+    item_url = entry.get("link") or entry.get("id") or ""
+    if not item_url:
+        return None
+
+    title = entry.get("title", "(제목 없음)").strip()
+    summary = _clean_summary(
+        entry.get("summary") or entry.get("description") or ""
+    )
+
+    # Keyword filtering
+    if filter_keyword:
+        content_to_check = (title + " " + summary).lower()
+        if filter_keyword not in content_to_check:
+            return None
+
+    raw_date = (
+        entry.get("published")
+        or entry.get("updated")
+        or entry.get("created")
+    )
+    parsed_date = (
+        entry.get("published_parsed")
+        or entry.get("updated_parsed")
+        or entry.get("created_parsed")
+    )
+    published_at = _normalize_date(raw_date, parsed_date)
+
+    # Column order must match database.NEWS_COLUMNS.
+    return (title, item_url, summary, published_at, name, category, fetched_at)
+
+
+def _validators(
+    url: str, filter_keyword: str, response: httpx.Response
+) -> ValidatorRow | None:
+    """
+    Return the response's (url, filter_keyword, etag, last_modified) for the next
+    conditional GET. The keyword is part of the key because what was stored from
+    this body depends on it.
+    """
+    etag = response.headers.get("etag")
+    last_modified = response.headers.get("last-modified")
+    if etag or last_modified:
+        return (url, filter_keyword, etag, last_modified)
+    return None
+
+
+async def _fetch_rss(
+    source: dict, client: httpx.AsyncClient
+) -> tuple[list[NewsRow], ValidatorRow | None]:
+    """
+    Fetch and parse a single RSS/Atom feed into NEWS_COLUMNS-ordered tuples.
+    Also returns the response's cache validators; the caller stores them together
+    with the items, so a failed DB write can't leave the feed marked as seen.
+    """
     url = source["url"]
-    name = source["name"]
-    category = source.get("category", "")
+    # Rows of one feed already share these objects. Interning the config strings
+    # also dedupes them across feeds and refreshes (e.g. one category object).
+    name = sys.intern(source["name"])
+    category = sys.intern(source.get("category", ""))
     fetched_at = datetime.now(timezone.utc).isoformat()
+    filter_keyword = source.get("filter_keyword", "").lower()
+
+    # Conditional GET: let the server answer 304 when the feed hasn't changed
+    # since it was last processed with the same filter_keyword.
+    request_headers = {}
+    validators = await get_feed_validators(url, filter_keyword)
+    if validators:
+        if validators["etag"]:
+            request_headers["If-None-Match"] = validators["etag"]
+        if validators["last_modified"]:
+            request_headers["If-Modified-Since"] = validators["last_modified"]
 
     try:
-        async with httpx.AsyncClient(
-            timeout=REQUEST_TIMEOUT,
-            follow_redirects=True,
-            headers={"User-Agent": "newsecurity/1.0 (+https://github.com/newsecurity)"},
-        ) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            raw_content = response.content
+        response = await client.get(url, headers=request_headers)
+        if response.status_code == httpx.codes.NOT_MODIFIED:
+            logger.info("[%s] Not modified since last fetch", name)
+            return [], None
+        response.raise_for_status()
+        raw_content = response.content
     except Exception as exc:
-        logger.warning(f"[{name}] HTTP fetch failed: {exc}")
-        return []
+        logger.warning("[%s] HTTP fetch failed: %s", name, exc)
+        return [], None
 
-    feed = feedparser.parse(raw_content)
+    if filter_keyword and not _may_contain_keyword(raw_content, filter_keyword):
+        logger.info("[%s] Keyword '%s' not in feed; skipping parse", name, filter_keyword)
+        # An unchanged body still won't match this keyword, so it may be 304'd.
+        return [], _validators(url, filter_keyword, response)
 
-    if feed.bozo and not feed.entries:
-        logger.warning(f"[{name}] Feed parse error: {feed.bozo_exception}")
-        return []
+    # feedparser is CPU-bound; keep it off the event loop so other feeds' I/O proceeds.
+    feed = await asyncio.to_thread(feedparser.parse, raw_content)
 
-    items = []
-    filter_keyword = source.get("filter_keyword", "").lower()
+    if feed.bozo and not feed.entries:
+        logger.warning("[%s] Feed parse error: %s", name, feed.bozo_exception)
+        return [], None
 
+    items: list[NewsRow] = []
     for entry in feed.entries:
-        item_url = entry.get("link") or entry.get("id") or ""
-        if not item_url:
-            continue
-
-        title = entry.get("title", "(제목 없음)").strip()
-        summary = _clean_summary(
-            entry.get("summary") or entry.get("description") or ""
-        )
+        item = _entry_to_item(entry, name, category, fetched_at, filter_keyword)
+        if item is not None:
+            items.append(item)
 
-        # Keyword filtering
-        if filter_keyword:
-            content_to_check = (title + " " + summary).lower()
-            if filter_keyword not in content_to_check:
-                continue
+    logger.info("[%s] Fetched %d items", name, len(items))
+    return items, _validators(url, filter_keyword, response)
 
-        raw_date = (
-            entry.get("published")
-            or entry.get("updated")
-            or entry.get("created")
-        )
-        published_at = _normalize_date(raw_date)
-
-        items.append(
-            {
-                "title": title,
-                "url": item_url,
-                "summary": summary,
-                "published_at": published_at,
-                "source_name": name,
-                "category": category,
-                "fetched_at": fetched_at,
-            }
-        )
 
-    logger.info(f"[{name}] Fetched {len(items)} items")
-    return items
+async def _fetch_rss_limited(
+    source: dict, client: httpx.AsyncClient, host_lock: asyncio.Lock
+) -> tuple[list[NewsRow], ValidatorRow | None]:
+    """Run _fetch_rss once this source's host is free and a global slot is available."""
+    # Take the host lock first so feeds queued behind a slow host don't hold global slots.
+    async with host_lock, _FEED_SEM:
+        return await _fetch_rss(source, client)
 
 
-async def fetch_all_feeds() -> list[dict]:
+async def fetch_all_feeds() -> tuple[list[NewsRow], list[ValidatorRow]]:
     """
     Fetch all configured sources concurrently.
+    Returns (items, validators): NEWS_COLUMNS-ordered item tuples and the feeds'
+    cache validators, both to be passed to upsert_news_items().
     RSS sources are handled here; scraper sources are dispatched to their modules.
     """
-    sources = _load_sources()
+    sources = load_sources_cached()
+    client = _get_client()
+    host_locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
     tasks = []
 
     for source in sources:
         src_type = source.get("type", "rss")
         if src_type == "rss":
-            tasks.append(_fetch_rss(source))
+            host = urlsplit(source["url"]).netloc
+            tasks.append(_fetch_rss_limited(source, client, host_locks[host]))
         elif src_type == "scraper":
             # Future: dynamically import scrapers/<scraper_module>.py
             module_name = source.get("scraper_module", "")
             logger.warning(
-                f"[{source['name']}] Scraper type not yet implemented "
-                f"(module: {module_name}). Skipping."
+                "[%s] Scraper type not yet implemented (module: %s). Skipping.",
+                source["name"], module_name,
             )
         else:
-            logger.warning(f"[{source['name']}] Unknown source type '{src_type}'. Skipping.")
+            logger.warning("[%s] Unknown source type '%s'. Skipping.", source["name"], src_type)
 
     results = await asyncio.gather(*tasks, return_exceptions=True)
 
-    all_items: list[dict] = []
+    all_items: list[NewsRow] = []
+    all_validators: list[ValidatorRow] = []
     for result in results:
-        if isinstance(result, Exception):
-            logger.error(f"Feed fetch exception: {result}")
-        elif isinstance(result, list):
-            all_items.extend(result)
+        if isinstance(result, BaseException):
+            logger.error("Feed fetch exception: %r", result)
+        else:
+            items, validators = result
+            all_items.extend(items)
+            if validators is not None:
+                all_validators.append(validators)
 
-    logger.info(f"Total fetched across all feeds: {len(all_items)} items")
-    return all_items
+    logger.info("Total fetched across all feeds: %d items", len(all_items))
+    return all_items, all_validators
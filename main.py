@@ -10,15 +10,17 @@ Endpoints:
 
 import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
+from typing import Any
 
-import yaml
+import orjson
 from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 
-from database import init_db, get_news, get_total_count
+from database import init_db, close_db, get_news_json, get_total_count
+from feed_parser import close_client, load_sources_cached
 from scheduler import start_scheduler, run_refresh_now
 
 logging.basicConfig(
@@ -27,7 +29,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-SOURCES_PATH = Path(__file__).parent / "sources.yaml"
 STATIC_DIR = Path(__file__).parent / "static"
 
 
@@ -38,7 +39,7 @@ async def lifespan(app: FastAPI):
     start_scheduler()
 
     # Run first fetch immediately without blocking startup
-    asyncio.create_task(run_refresh_now())
+    initial_fetch = asyncio.create_task(run_refresh_now())
     logger.info("Initial feed fetch task created.")
 
     yield  # app is running
@@ -47,6 +48,11 @@ async def lifespan(app: FastAPI):
     from scheduler import scheduler
     scheduler.shutdown(wait=False)
     logger.info("Scheduler shut down.")
+    initial_fetch.cancel()
+    with suppress(asyncio.CancelledError):
+        await initial_fetch
+    await close_client()
+    await close_db()
 
 
 app = FastAPI(
@@ -76,29 +82,46 @@ async def serve_frontend():
 async def api_news(
     limit: int = Query(default=100, ge=1, le=500),
     offset: int = Query(default=0, ge=0),
+    after_published_at: str | None = Query(default=None),
+    after_fetched_at: str | None = Query(default=None),
+    after_id: int | None = Query(default=None),
 ):
-    """Return paginated news items ordered by published_at DESC."""
-    items = await get_news(limit=limit, offset=offset)
+    """
+    Return paginated news items ordered by published_at DESC.
+    Pass the previous response's next_cursor fields (after_*) to fetch the next page.
+    """
+    after: tuple[str, str, int] | None = None
+    if after_published_at is not None and after_fetched_at is not None and after_id is not None:
+        after = (after_published_at, after_fetched_at, after_id)
+    elif (after_published_at, after_fetched_at, after_id) != (None, None, None):
+        raise HTTPException(
+            status_code=400,
+            detail="after_published_at, after_fetched_at and after_id must be given together",
+        )
+
+    items_json, last = await get_news_json(limit=limit, offset=offset, after=after)
     total = await get_total_count()
-    return {
-        "total": total,
-        "limit": limit,
-        "offset": offset,
-        "items": items,
-    }
-
-
+    next_cursor = (
+        {"after_published_at": last[0], "after_fetched_at": last[1], "after_id": last[2]}
+        if last else None
+    )
+    envelope = orjson.dumps(
+        {"total": total, "limit": limit, "offset": offset, "next_cursor": next_cursor}
+    )
+    # items_json is already encoded by SQLite; splice it into the envelope as-is.
+    body = envelope[:-1] + b',"items":' + items_json.encode() + b"}"
+    return Response(content=body, media_type="application/json")
+
+
+# Return annotations let FastAPI serialize straight to JSON bytes via Pydantic.
 @app.get("/api/sources")
-async def api_sources():
+async def api_sources() -> dict[str, list[dict[str, Any]]]:
     """Return the list of configured news sources."""
-    with open(SOURCES_PATH, encoding="utf-8") as f:
-        data = yaml.safe_load(f)
-    sources = data.get("sources", [])
-    return {"sources": sources}
+    return {"sources": load_sources_cached()}
 
 
 @app.post("/api/refresh")
-async def api_refresh():
+async def api_refresh() -> dict[str, Any]:
     """Trigger an immediate feed refresh and return result stats."""
     result = await run_refresh_now()
     return result
@@ -19,9 +19,9 @@ scheduler = AsyncIOScheduler()
 async def _refresh_job() -> None:
     """Fetch all feeds and store results in the database."""
     logger.info("Scheduler: starting feed refresh…")
-    items = await fetch_all_feeds()
-    count = await upsert_news_items(items)
-    logger.info(f"Scheduler: refresh complete — {count} new items inserted.")
+    items, validators = await fetch_all_feeds()
+    count = await upsert_news_items(items, validators)
+    logger.info("Scheduler: refresh complete — %d new items inserted.", count)
 
 
 def start_scheduler() -> None:
@@ -39,6 +39,6 @@ def start_scheduler() -> None:
 
 async def run_refresh_now() -> dict:
     """Trigger an immediate feed refresh (called from API endpoint)."""
-    items = await fetch_all_feeds()
-    count = await upsert_news_items(items)
+    items, validators = await fetch_all_feeds()
+    count = await upsert_news_items(items, validators)
     return {"status": "ok", "new_items": count, "total_fetched": len(items)}